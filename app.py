@@ -1,85 +1,364 @@
 import streamlit as st
 import pandas as pd
-import random
+import numpy as np
 import re
 import os
-import json
+import csv
+import time
+import logging
+import atexit
+import queue
+import threading
+import functools
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
+
+from trainer_core import (
+    STATUS_CATEGORIES, STATUS_WEIGHTS, json_dumps, json_loads,
+    append_status_log, replay_status_log, clear_status_log,
+    normalize_status, empty_value, apply_editor_changes, FenwickSampler, compute_weights,
+)
 
 # --- KONFIGURATION ---
 st.set_page_config(page_title="Vokabeltrainer V2", layout="wide")
 CONFIG_FILE = "modules.json"
+RATING_OPTIONS = {"🔴 Schwer": "Red", "🟢 Einfach": "Green"}
+REQUIRED_COLUMNS = [
+    'Deutsch', 'Farsi', 'English', 
+    'Beispielsatz', 'Beispielsatz_Farsi', 
+    'Status', 'Präposition', 'Artikel', 'Plural'
+]
+DATA_FORMAT = ".arrow"
+# Ab dieser Größe (rund 3000 Bewertungen) wird das Status-Log in die Arrow-Datei verdichtet
+STATUS_LOG_MAX_BYTES = 64 * 1024
+# So lange sammelt der Hintergrund-Thread Bewertungen, bevor er sie gemeinsam schreibt
+STATUS_WRITE_DELAY = 0.2
 
 # --- DATEN MANAGEMENT ---
 
-def load_module_config():
-    """Lädt die Liste der verfügbaren Module strikt aus der JSON-Datei."""
+def get_config_mtime():
+    return os.path.getmtime(CONFIG_FILE) if os.path.exists(CONFIG_FILE) else 0
+
+@st.cache_resource(show_spinner=False)
+def load_module_config(mtime):
+    """Lädt die Liste der verfügbaren Module strikt aus der JSON-Datei.
+
+    Das Dict wird pro Prozess und `mtime` einmal gehalten und von allen Sessions
+    geteilt, daher nie direkt verändern, sondern über save_module_config schreiben.
+    """
     if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(CONFIG_FILE, 'rb') as f:
+            return json_loads(f.read())
             
     default_config = {
         "B2: Verben mit Präpositionen": "vokabeln.csv",
         "B1: Allgemeiner Wortschatz (Basis)": "vokabeln_b1.csv"
     }
     
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(default_config, f, indent=4)
+    write_module_config(default_config)
     return default_config
 
+def write_module_config(config):
+    # Erst in eine Temp-Datei schreiben und dann ersetzen, damit nie eine halbe modules.json entsteht
+    tmp_file = CONFIG_FILE + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(json_dumps(config, indent=True))
+    os.replace(tmp_file, CONFIG_FILE)
+
 def save_module_config(config):
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=4, ensure_ascii=False)
+    write_module_config(config)
+    load_module_config.clear()
 
 def create_new_module_file(filename):
-    columns = [
-        'Deutsch', 'Farsi', 'English', 
-        'Beispielsatz', 'Beispielsatz_Farsi', 
-        'Status', 'Präposition', 'Artikel', 'Plural'
-    ]
-    df = pd.DataFrame(columns=columns)
-    df.to_csv(filename, index=False)
+    # Ein leeres Modul ist nur die Kopfzeile, dafür braucht es keinen DataFrame
+    with open(filename, 'w', encoding='utf-8', newline='') as f:
+        f.write(",".join(REQUIRED_COLUMNS) + "\n")
+
+def get_data_path(filename):
+    """Pfad der Arrow-Datei, in der das Modul `filename` gespeichert wird."""
+    return os.path.splitext(filename)[0] + DATA_FORMAT
+
+def get_file_fingerprint(filename):
+    """Cache-Schlüssel aus der Datei, die load_data liest: Größe und mtime_ns.
+
+    Das Status-Log zählt nicht mit: Bewertungen werden direkt in den geteilten
+    DataFrame geschrieben, der Cache bleibt dadurch aktuell.
+    """
+    # Gibt es die Arrow-Datei, spielt die CSV keine Rolle mehr (z.B. nach git pull)
+    data_path = get_data_path(filename)
+    path = data_path if os.path.exists(data_path) else filename
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+def read_csv_file(filename):
+    """CSV-Import über den multithreaded Arrow-Reader; fehlerhafte Zeilen werden übersprungen.
+
+    Leere Zellen bleiben in beiden Parsern leere Strings statt NaN, ein
+    nachträgliches fillna über den ganzen DataFrame ist nicht nötig. Alle
+    Textzellen sind Python-str, die Anzeige braucht kein str() mehr.
+    """
+    # Alle Spalten von vornherein als Text, wie dtype=str beim pandas-Parser. Erst raten und dann
+    # casten würde den Originaltext ändern ("007" -> "7", "1.50" -> "1.5")
+    with open(filename, encoding='utf-8-sig', newline='') as f:
+        header = next(csv.reader(f), [])
+    try:
+        table = pa_csv.read_csv(
+            filename,
+            read_options=pa_csv.ReadOptions(use_threads=True, block_size=1 << 20),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True, invalid_row_handler=lambda row: 'skip'),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in header},
+                null_values=[],
+                strings_can_be_null=False,
+            ),
+        )
+        return table.to_pandas()
+    except pa.ArrowInvalid:
+        # Was Arrow nicht parsen kann, bekommt noch eine Chance mit dem pandas-Parser
+        return pd.read_csv(filename, on_bad_lines='skip', keep_default_na=False, na_filter=False, dtype=str)
+
+def read_module_file(path):
+    """Liest eine Arrow-IPC-Datei über memory_map, statt sie komplett in den Speicher zu kopieren."""
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+def write_module_file(df, path):
+    # Unkomprimiert, damit die Datei beim Lesen direkt gemappt werden kann. Wie bei modules.json
+    # über eine Temp-Datei: die Arrow-Datei ist die einzige Kopie der Bewertungen und Änderungen
+    tmp_path = path + ".tmp"
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
 
 def load_data(filename):
-    if not os.path.exists(filename):
+    """Lädt ein Modul.
+
+    Gelesen wird die Arrow-Datei. Nur wenn es sie noch nicht gibt, wird die
+    CSV einmalig eingelesen und als Arrow-Datei abgelegt. Eine später
+    geänderte CSV überschreibt nichts, Bewertungen und Änderungen bleiben.
+    Anschließend werden die Bewertungen aus dem Status-Log nachgespielt.
+    """
+    if not os.path.exists(filename) and not os.path.exists(get_data_path(filename)):
         return pd.DataFrame()
     
     try:
-        df = pd.read_csv(filename, on_bad_lines='skip')
-        required_cols = ['Deutsch', 'Farsi', 'English', 'Beispielsatz', 'Beispielsatz_Farsi', 'Status', 'Präposition', 'Artikel', 'Plural']
-        for col in required_cols:
-            if col not in df.columns:
-                df[col] = "" if col != 'Status' else "Neutral"
-        return df.fillna("")
+        # Noch eingereihte Bewertungen müssen im Log stehen, bevor es nachgespielt wird
+        writer = get_status_writer()
+        writer.flush()
+        error = writer.take_error()
+        if error:
+            st.warning(f"Nicht alle Bewertungen konnten gespeichert werden: {error}")
+        if not os.path.exists(get_data_path(filename)):
+            df = read_csv_file(filename)
+            migrate = True
+        else:
+            df = read_module_file(get_data_path(filename))
+            migrate = False
+        missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        if missing:
+            df = df.assign(**{col: empty_value(col) for col in missing})
+        df['Status'] = normalize_status(df['Status'])
+        # Zeilen werden überall positional angesprochen (current_idx, Status-Log, Sampler)
+        df.reset_index(drop=True, inplace=True)
+        if migrate:
+            write_module_file(df, get_data_path(filename))
+            clear_status_log(filename)
+        return replay_status_log(df, filename)
     except Exception as e:
         st.error(f"Fehler beim Laden: {e}")
         return pd.DataFrame()
 
+class ModuleCache:
+    """Geladener Stand eines Moduls: DataFrame, Textspalten und der Fingerprint, zu dem beide gehören.
+
+    Bewertungen verändern den DataFrame direkt. Sitzungsbezogenes (aktuelle
+    Karte, Verlauf, Gewichte) liegt weiter in st.session_state.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.fingerprint = None
+        self.df = None
+        self.columns = None
+
+    def get(self):
+        """(df, columns, fingerprint); neu geladen wird nur, wenn sich die Datei geändert hat."""
+        fingerprint = get_file_fingerprint(self.filename)
+        with self.lock:
+            if self.df is None or fingerprint != self.fingerprint:
+                self.df = load_data(self.filename)
+                # Textspalten als flache NumPy-Arrays, damit eine Karte ohne pandas-Indexing gebaut wird;
+                # den Status braucht die Karte nicht, die Gewichte dazu hält der Sampler
+                self.columns = {col: self.df[col].to_numpy() for col in self.df.columns if col != 'Status'}
+                # Erst nach dem Laden bestimmen: die CSV-Migration legt die Arrow-Datei gerade erst an
+                self.fingerprint = get_file_fingerprint(self.filename)
+            return self.df, self.columns, self.fingerprint
+
+    def invalidate(self):
+        with self.lock:
+            self.df = None
+
+@st.cache_resource(show_spinner=False)
+def get_module_cache(filename):
+    """Ein Eintrag pro Modul und Prozess, geteilt von allen Sessions.
+
+    Der Schlüssel ist nur der Dateiname: ein neuer Stand ersetzt den alten,
+    statt wie bei einem Fingerprint-Schlüssel daneben im Speicher zu bleiben.
+    """
+    return ModuleCache(filename)
+
 def save_data(df, filename):
-    df.to_csv(filename, index=False)
+    """Schreibt das komplette Modul und verdichtet damit das Status-Log."""
+    writer = get_status_writer()
+    # Offene Bewertungen zuerst ins Log, sonst landen sie mit veralteten Positionen im neuen Log
+    writer.flush()
+    with writer.lock:
+        write_module_file(df, get_data_path(filename))
+        clear_status_log(filename)
+        # Was nicht ins Log geschrieben werden konnte, steht jetzt in der Arrow-Datei
+        writer.failed.pop(filename, None)
+    get_module_cache(filename).invalidate()
+
+def compact_status_log(filename):
+    """Spielt das Status-Log in die Arrow-Datei ein und löscht es danach.
+
+    Arbeitet nur auf den Dateien: ein DataFrame im Speicher kann veraltet
+    sein, wenn eine andere Session das Modul inzwischen neu geladen hat.
+    """
+    data_path = get_data_path(filename)
+    df = read_module_file(data_path)
+    df['Status'] = normalize_status(df['Status'])
+    write_module_file(replay_status_log(df, filename), data_path)
+    clear_status_log(filename)
+
+class StatusWriter:
+    """Schreibt Bewertungen aus einem Hintergrund-Thread ins Status-Log, damit der Rerun nicht auf die Platte wartet.
+
+    Wird ein Log zu groß, verdichtet der Thread es auch gleich in die
+    Arrow-Datei; der Bewertungs-Callback wartet darauf nicht.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        # Hält, wer Arrow-Datei und Log austauscht (Verdichten, save_data)
+        self.lock = threading.Lock()
+        # Nicht geschriebene Bewertungen pro Datei, beim nächsten Durchlauf neu versucht
+        self.failed = {}
+        self.error = None
+        threading.Thread(target=self._run, daemon=True).start()
+        # Daemon-Threads werden beim Beenden einfach abgebrochen, ausstehende Bewertungen vorher schreiben
+        atexit.register(self.flush)
+
+    def put(self, filename, pos, status):
+        self.queue.put((filename, pos, status))
+
+    def flush(self):
+        """Wartet, bis alle eingereihten Bewertungen abgearbeitet sind."""
+        self.queue.join()
+
+    def take_error(self):
+        """Letzter Schreibfehler seit dem vorigen Aufruf, sonst None."""
+        with self.lock:
+            error, self.error = self.error, None
+        return error
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            try:
+                time.sleep(STATUS_WRITE_DELAY)
+                while True:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                # Pro Datei und Zeile zählt nur die letzte Bewertung
+                with self.lock:
+                    # Fehlgeschlagene zuerst, neuere Bewertungen derselben Zeile überschreiben sie
+                    latest, self.failed = self.failed, {}
+                    for filename, pos, status in batch:
+                        latest.setdefault(filename, {})[pos] = status
+                    # Ohne Session gibt es hier kein st.error: Fehler werden geloggt und über
+                    # take_error() gemeldet, der Thread muss aber weiterlaufen, sonst wartet flush() für immer
+                    for filename, entries in latest.items():
+                        try:
+                            size = append_status_log(filename, entries)
+                        except Exception as e:
+                            logging.exception("Status-Log für %s konnte nicht geschrieben werden", filename)
+                            self.failed[filename] = entries
+                            self.error = e
+                            continue
+                        if size > STATUS_LOG_MAX_BYTES:
+                            try:
+                                compact_status_log(filename)
+                            except Exception as e:
+                                # Das Log bleibt vollständig, verdichtet wird beim nächsten Anhängen erneut
+                                logging.exception("Status-Log für %s konnte nicht verdichtet werden", filename)
+                                self.error = e
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+@st.cache_resource(show_spinner=False)
+def get_status_writer():
+    """Ein Writer-Thread pro Prozess, geteilt von allen Sessions."""
+    return StatusWriter()
+
+def update_status(df, pos, status, filename):
+    if status not in STATUS_CATEGORIES:
+        raise ValueError(f"Unbekannter Status: {status}")
+    # Feste Kategorien: der Schreibzugriff setzt nur einen int8-Code, ohne die Spalte umzutypen
+    df.iat[pos, df.columns.get_loc('Status')] = status
+    sampler = st.session_state.get('sampler')
+    if sampler is not None and sampler.size == len(df):
+        sampler.update(pos, STATUS_WEIGHTS[status])
+    writer = get_status_writer()
+    writer.put(filename, pos, status)
+    # Geschrieben wird im Hintergrund, ein Fehler zeigt sich daher erst bei der nächsten Bewertung
+    error = writer.take_error()
+    if error:
+        st.error(f"Bewertungen konnten nicht gespeichert werden: {error}")
+    else:
+        st.toast(f"Status gespeichert: {status}", icon="💾")
+
+def reset_sampler(df):
+    st.session_state.sampler = FenwickSampler(compute_weights(df))
 
-def update_status(df, index, status, filename):
-    df.at[index, 'Status'] = status
-    save_data(df, filename)
-    st.toast(f"Status gespeichert: {status}", icon="💾")
+def get_rng():
+    """Zufallsgenerator der Session; über den Seed in st.session_state lässt sich eine Ziehfolge nachstellen."""
+    if 'rng' not in st.session_state:
+        seed = st.session_state.setdefault('seed', int.from_bytes(os.urandom(8), 'little'))
+        st.session_state.rng = np.random.Generator(np.random.PCG64DXSM(seed))
+    return st.session_state.rng
 
 def get_weighted_random_index(df):
     if df.empty: return 0
-    weights = [10 if s == 'Red' else 0.2 if s == 'Green' else 2 for s in df['Status']]
-    try:
-        return random.choices(df.index, weights=weights, k=1)[0]
-    except:
-        return 0
+    sampler = st.session_state.get('sampler')
+    if sampler is None or sampler.size != len(df):
+        reset_sampler(df)
+    return st.session_state.sampler.sample(get_rng())
+
+@functools.lru_cache(maxsize=2048)
+def _compile_term(term):
+    return re.compile(re.escape(term), re.IGNORECASE)
 
 def hide_term_in_sentence(sentence, term):
     if not sentence or not term: return sentence
-    pattern = re.compile(re.escape(term), re.IGNORECASE)
-    return pattern.sub("___", sentence)
+    # Kommt der Begriff gar nicht vor, reicht eine Substring-Suche statt des Regex-Durchlaufs
+    if term.lower() not in sentence.lower(): return sentence
+    return _compile_term(term).sub("___", sentence)
 
 # --- INITIALISIERUNG ---
 
-modules = load_module_config()
+modules = load_module_config(get_config_mtime())
 
-if 'current_dataset_name' not in st.session_state:
+# Auch greifen, wenn das gewählte Modul aus modules.json verschwunden ist:
+# die Sidebar-Auswahl ist direkt an diesen Key gebunden
+if st.session_state.get('current_dataset_name') not in modules:
     if "🏆 B1: Gesamtliste (780 Wörter)" in modules:
         st.session_state.current_dataset_name = "🏆 B1: Gesamtliste (780 Wörter)"
     else:
@@ -90,215 +369,248 @@ if 'current_dataset_name' not in st.session_state:
 
 current_file = modules.get(st.session_state.current_dataset_name, "vokabeln.csv")
 
-if 'vocab_df' not in st.session_state or st.session_state.get('loaded_file') != current_file:
-    st.session_state.vocab_df = load_data(current_file)
+# Bei einem Cache-Treffer kostet das nur einen stat-Aufruf, keine Kopie pro Session
+df, columns, fingerprint = get_module_cache(current_file).get()
+
+if st.session_state.get('loaded_file') != current_file:
     st.session_state.loaded_file = current_file
+    reset_sampler(df)
     st.session_state.history = []
-    if not st.session_state.vocab_df.empty:
-        st.session_state.current_idx = get_weighted_random_index(st.session_state.vocab_df)
+    if not df.empty:
+        st.session_state.current_idx = get_weighted_random_index(df)
     else:
         st.session_state.current_idx = 0
     st.session_state.show_solution = False
 
-df = st.session_state.vocab_df
-
 # --- NAVIGATION & STATE HELPERS ---
 
+def build_card(columns, idx):
+    """Werte der Karte `idx` als dict, inkl. der daraus abgeleiteten Anzeige-Felder."""
+    size = len(columns['Deutsch']) if 'Deutsch' in columns else 0
+    if 0 <= idx < size:
+        card = {col: values[idx] for col, values in columns.items()}
+    else:
+        card = {col: "" for col in columns}
+    card['is_b2'] = card.get('Präposition', "").strip() != ""
+    if card['is_b2']:
+        card['term_to_hide'] = card['Präposition'].split('+')[0].split('/')[0].strip()
+    else:
+        card['term_to_hide'] = card.get('Deutsch', "")
+    card['masked'] = hide_term_in_sentence(card.get('Beispielsatz', ""), card['term_to_hide'])
+    return card
+
+def get_card(columns, current_file, fingerprint):
+    """Aktuelle Karte aus dem Session-Cache; neu gebaut nur beim Blättern oder nach Neuladen des Moduls."""
+    # Nicht id(columns): nach dem Neuladen kann das neue dict dieselbe Adresse bekommen
+    card_key = (current_file, fingerprint, st.session_state.current_idx)
+    if st.session_state.get('cached_card_key') != card_key:
+        st.session_state.card = build_card(columns, st.session_state.current_idx)
+        st.session_state.cached_card_key = card_key
+    return st.session_state.card
+
 def reset_input():
     """Callback um das Eingabefeld zu leeren"""
     st.session_state.write_input = ""
 
-def next_card():
+def next_card(df):
+    reset_input()
     st.session_state.history.append(st.session_state.current_idx)
-    current_df = st.session_state.vocab_df
-    if not current_df.empty:
-        st.session_state.current_idx = get_weighted_random_index(current_df)
+    if not df.empty:
+        st.session_state.current_idx = get_weighted_random_index(df)
     st.session_state.show_solution = False
 
 def prev_card():
+    reset_input()
     if st.session_state.history:
         st.session_state.current_idx = st.session_state.history.pop()
         st.session_state.show_solution = False
 
+def create_module():
+    """Callback des Formulars "Neues Modul erstellen"."""
+    new_mod_name = st.session_state.new_module_name
+    if not new_mod_name:
+        return
+    safe_filename = "".join([c for c in new_mod_name if c.isalnum()]).lower() + "_custom.csv"
+    create_new_module_file(safe_filename)
+    save_module_config({**load_module_config(get_config_mtime()), new_mod_name: safe_filename})
+    # Im Callback, also vor dem Rendern der Sidebar-Auswahl, darf ihr Key noch gesetzt werden
+    st.session_state.current_dataset_name = new_mod_name
+    st.toast("Erstellt!", icon="✅")
+
+def rate_card(df, current_file, key):
+    """on_change der Bewertungsleiste: Status speichern und die Auswahl wieder leeren."""
+    choice = st.session_state[key]
+    st.session_state[key] = None
+    if choice:
+        update_status(df, st.session_state.current_idx, RATING_OPTIONS[choice], current_file)
+
 # --- SIDEBAR ---
 
 with st.sidebar:
     st.title("📚 Module")
     st.caption("Wähle ein Thema:")
     
-    sorted_keys = sorted(modules.keys())
-    for mod_name in sorted_keys:
-        btn_type = "primary" if st.session_state.current_dataset_name == mod_name else "secondary"
-        if st.button(mod_name, key=f"btn_{mod_name}", type=btn_type, use_container_width=True):
-            st.session_state.current_dataset_name = mod_name
-            st.rerun()
+    if modules:
+        # An session_state gebunden: ein Wechsel löst selbst den Rerun aus
+        st.radio("Modul", sorted(modules.keys()), key="current_dataset_name", label_visibility="collapsed")
 
     st.markdown("---")
     with st.expander("➕ Neues Modul erstellen"):
         with st.form("new_module_form"):
-            new_mod_name = st.text_input("Name")
-            submit_new = st.form_submit_button("Erstellen")
-            if submit_new and new_mod_name:
-                safe_filename = "".join([c for c in new_mod_name if c.isalnum()]).lower() + "_custom.csv"
-                create_new_module_file(safe_filename)
-                modules[new_mod_name] = safe_filename
-                save_module_config(modules)
-                st.session_state.current_dataset_name = new_mod_name
-                st.success("Erstellt!")
-                st.rerun()
+            st.text_input("Name", key="new_module_name")
+            st.form_submit_button("Erstellen", on_click=create_module)
 
-# --- HAUPTBEREICH ---
-
-st.title(f"Lektion: {st.session_state.current_dataset_name}")
+# --- ANSICHTEN ---
 
-if df.empty:
-    st.warning("⚠️ Keine Daten gefunden.")
-    st.info("Bitte führe ggf. das Python-Skript aus oder wähle ein anderes Modul.")
-    row = pd.Series({c: "" for c in df.columns})
-    is_empty_mode = True
-else:
-    if st.session_state.current_idx not in df.index:
-        st.session_state.current_idx = df.index[0]
-    row = df.loc[st.session_state.current_idx]
-    is_empty_mode = False
+def render_rating(df, current_file, prefix):
+    """Schwer/Einfach-Bewertung der aktuellen Karte; `prefix` hält die Widget-Keys je Ansicht eindeutig."""
+    # Ein Widget statt zwei Buttons; als Callback rendert Streamlit danach nur das Fragment neu
+    key = f"{prefix}_rating"
+    st.segmented_control("Bewertung", list(RATING_OPTIONS), key=key, label_visibility="collapsed",
+                         on_change=rate_card, args=(df, current_file, key))
 
-is_b2_mode = "Präposition" in row and str(row['Präposition']).strip() != ""
+def render_navigation(df, prefix):
+    """Zurück/Weiter-Leiste unter einer Quiz-Ansicht.
 
-tab1, tab2, tab3, tab4 = st.tabs(["🃏 Flashcards", "✍️ Schreiben", "🧩 Lückentext", "📝 Liste"])
+    Liegt bewusst außerhalb der Fragmente: ein Callback innerhalb eines
+    Fragments würde nur dieses neu rendern, eine neue Karte braucht aber
+    einen kompletten Rerun.
+    """
+    st.markdown("---")
+    c_prev, c_next = st.columns([1,1])
+    c_prev.button("⬅️ Zurück", key=f"{prefix}_back", disabled=not st.session_state.history, on_click=prev_card)
+    c_next.button("Nächste Karte ➡️", key=f"{prefix}_next", type="primary", on_click=next_card, args=(df,))
 
-with tab1:
-    if is_empty_mode:
-        st.write("---")
-    else:
-        st.subheader("Wissenstest")
-        c1, c2 = st.columns(2)
-        with c1:
-            st.info(f"**{row['Deutsch']}**")
-            if not is_b2_mode and row['Plural']:
-                 st.caption(f"Plural: {row['Plural']}")
-        with c2:
-            if st.session_state.show_solution:
-                if is_b2_mode:
-                    st.success(f"Präposition: **{row['Präposition']}**")
-                else:
-                    art = row['Artikel'] if row['Artikel'] else "-"
-                    st.success(f"Artikel: **{art}**")
-                st.markdown(f"### 🇮🇷 {row['Farsi']}")
-                st.markdown("---")
-                if row['Beispielsatz']:
-                    st.markdown(f"🇩🇪 _{row['Beispielsatz']}_")
-                if row['Beispielsatz_Farsi']:
-                    st.markdown(f"🇮🇷 _{row['Beispielsatz_Farsi']}_")
-                
-                c_a, c_b = st.columns(2)
-                if c_a.button("🔴 Schwer", key="fc_red"):
-                    update_status(df, st.session_state.current_idx, "Red", current_file)
-                    st.rerun()
-                if c_b.button("🟢 Einfach", key="fc_green"):
-                    update_status(df, st.session_state.current_idx, "Green", current_file)
-                    st.rerun()
-            else:
-                st.markdown("### ???")
-                if st.button("Lösung zeigen", key="fc_sol"):
-                    st.session_state.show_solution = True
-                    st.rerun()
-        st.markdown("---")
-        c_prev, c_next = st.columns([1,1])
-        if c_prev.button("⬅️ Zurück", key="fc_back", disabled=not st.session_state.history):
-            prev_card()
-            st.rerun()
-        if c_next.button("Nächste Karte ➡️", key="fc_next", type="primary"):
-            next_card()
-            st.rerun()
-
-with tab2:
+@st.fragment
+def render_flashcards(df, card, current_file, is_empty_mode):
     if is_empty_mode:
         st.write("---")
-    else:
-        st.subheader("Übersetze ins Deutsche")
-        st.markdown(f"### 🇮🇷 {row['Farsi']}")
-        with st.form("write_form"):
-            # Das Key-Argument ist wichtig für den Reset
-            inp = st.text_input("Deutsches Wort:", key="write_input")
-            submitted = st.form_submit_button("Prüfen")
-        
-        if submitted:
-            st.session_state.show_solution = True
-        
+        return
+    st.subheader("Wissenstest")
+    # Alle Felder einmal aus dem Karten-dict holen, danach nur noch lokale Namen
+    deutsch, farsi, plural, artikel, praep, satz, satz_fa = (card[k] for k in (
+        'Deutsch', 'Farsi', 'Plural', 'Artikel', 'Präposition', 'Beispielsatz', 'Beispielsatz_Farsi'))
+    is_b2_mode = card['is_b2']
+    c1, c2 = st.columns(2)
+    with c1:
+        st.info(f"**{deutsch}**")
+        if not is_b2_mode and plural:
+             st.caption(f"Plural: {plural}")
+    with c2:
         if st.session_state.show_solution:
-            user_input = inp.strip().lower()
-            target = str(row['Deutsch']).strip().lower()
-            
-            if user_input and user_input in target:
-                st.success("Richtig!")
-            elif not user_input:
-                st.warning("⚠️ Du hast nichts eingegeben.")
+            if is_b2_mode:
+                st.success(f"Präposition: **{praep}**")
             else:
-                st.error(f"Falsch. Lösung: **{row['Deutsch']}**")
-            
-            st.markdown(f"🇩🇪 _{row['Beispielsatz']}_")
+                art = artikel if artikel else "-"
+                st.success(f"Artikel: **{art}**")
+            st.markdown(f"### 🇮🇷 {farsi}")
+            st.markdown("---")
+            if satz:
+                st.markdown(f"🇩🇪 _{satz}_")
+            if satz_fa:
+                st.markdown(f"🇮🇷 _{satz_fa}_")
             
-            c_a, c_b = st.columns(2)
-            if c_a.button("🔴 Schwer", key="wr_red"):
-                update_status(df, st.session_state.current_idx, "Red", current_file)
-                st.rerun()
-            if c_b.button("🟢 Einfach", key="wr_green"):
-                update_status(df, st.session_state.current_idx, "Green", current_file)
+            render_rating(df, current_file, "fc")
+        else:
+            st.markdown("### ???")
+            if st.button("Lösung zeigen", key="fc_sol"):
+                st.session_state.show_solution = True
                 st.rerun()
-        st.markdown("---")
+
+@st.fragment
+def render_writing(df, card, current_file, is_empty_mode):
+    if is_empty_mode:
+        st.write("---")
+        return
+    st.subheader("Übersetze ins Deutsche")
+    deutsch, farsi, satz = card['Deutsch'], card['Farsi'], card['Beispielsatz']
+    st.markdown(f"### 🇮🇷 {farsi}")
+    with st.form("write_form"):
+        # Das Key-Argument ist wichtig für den Reset
+        inp = st.text_input("Deutsches Wort:", key="write_input")
+        submitted = st.form_submit_button("Prüfen")
+    
+    if submitted:
+        st.session_state.show_solution = True
+    
+    if st.session_state.show_solution:
+        user_input = inp.strip().lower()
+        target = deutsch.strip().lower()
         
-        c_prev, c_next = st.columns([1,1])
+        if user_input and user_input in target:
+            st.success("Richtig!")
+        elif not user_input:
+            st.warning("⚠️ Du hast nichts eingegeben.")
+        else:
+            st.error(f"Falsch. Lösung: **{deutsch}**")
         
-        # HIER IST DIE ÄNDERUNG: on_click=reset_input
-        if c_prev.button("⬅️ Zurück", key="wr_back", disabled=not st.session_state.history, on_click=reset_input):
-            prev_card()
-            st.rerun()
-            
-        # HIER IST DIE ÄNDERUNG: on_click=reset_input
-        if c_next.button("Nächste Karte ➡️", key="wr_next", type="primary", on_click=reset_input):
-            next_card()
-            st.rerun()
+        st.markdown(f"🇩🇪 _{satz}_")
+        
+        render_rating(df, current_file, "wr")
 
-with tab3:
-    if is_empty_mode or not row['Beispielsatz']:
+@st.fragment
+def render_gap_text(df, card, current_file, is_empty_mode):
+    if is_empty_mode or not card['Beispielsatz']:
         st.write("Keine Sätze verfügbar.")
-    else:
-        st.subheader("Lückentext")
-        hidden_text = row['Beispielsatz']
-        term_to_hide = str(row['Präposition']).split('+')[0].split('/')[0].strip() if is_b2_mode else str(row['Deutsch'])
-        masked = hide_term_in_sentence(hidden_text, term_to_hide)
-        
-        st.markdown(f"### {masked}")
-        st.caption(f"Hinweis: {row['Farsi']}")
-        
-        if st.button("Aufdecken", key="gap_sol"):
-            st.session_state.show_solution = True
-            st.rerun()
-        if st.session_state.show_solution:
-            st.success(f"Lösung: **{term_to_hide}**")
-            st.markdown(f"_{row['Beispielsatz']}_")
-            c_a, c_b = st.columns(2)
-            if c_a.button("🔴 Schwer", key="gap_red"):
-                update_status(df, st.session_state.current_idx, "Red", current_file)
-                st.rerun()
-            if c_b.button("🟢 Einfach", key="gap_green"):
-                update_status(df, st.session_state.current_idx, "Green", current_file)
-                st.rerun()
-        st.markdown("---")
-        c_prev, c_next = st.columns([1,1])
-        if c_prev.button("⬅️ Zurück", key="gap_back", disabled=not st.session_state.history):
-            prev_card()
-            st.rerun()
-        if c_next.button("Nächste Karte ➡️", key="gap_next", type="primary"):
-            next_card()
-            st.rerun()
-
-with tab4:
+        return
+    st.subheader("Lückentext")
+    term_to_hide, masked, farsi, satz = card['term_to_hide'], card['masked'], card['Farsi'], card['Beispielsatz']
+    
+    st.markdown(f"### {masked}")
+    st.caption(f"Hinweis: {farsi}")
+    
+    if st.button("Aufdecken", key="gap_sol"):
+        st.session_state.show_solution = True
+        st.rerun()
+    if st.session_state.show_solution:
+        st.success(f"Lösung: **{term_to_hide}**")
+        st.markdown(f"_{satz}_")
+        render_rating(df, current_file, "gap")
+
+@st.fragment
+def render_list(df, current_file):
     st.subheader("Liste bearbeiten")
-    edited_df = st.data_editor(df, num_rows="dynamic", key="editor", use_container_width=True)
+    st.data_editor(df, num_rows="dynamic", key="editor", use_container_width=True)
     if st.button("💾 Speichern", type="primary"):
-        edited_df = edited_df.fillna("")
-        st.session_state.vocab_df = edited_df
-        save_data(edited_df, current_file)
+        apply_editor_changes(df, st.session_state.editor)
+        reset_sampler(df)
+        save_data(df, current_file)
+        # Deltas sind jetzt in df enthalten und dürfen nicht erneut angewendet werden
+        del st.session_state.editor
         st.success("Gespeichert!")
-        st.rerun()
\ No newline at end of file
+        st.rerun()
+
+# --- HAUPTBEREICH ---
+
+st.title(f"Lektion: {st.session_state.current_dataset_name}")
+
+if df.empty:
+    st.warning("⚠️ Keine Daten gefunden.")
+    st.info("Bitte führe ggf. das Python-Skript aus oder wähle ein anderes Modul.")
+    is_empty_mode = True
+else:
+    if not 0 <= st.session_state.current_idx < len(df):
+        st.session_state.current_idx = 0
+    is_empty_mode = False
+
+# Anders als st.tabs wird hier nur die gewählte Ansicht ausgeführt,
+# die Karte wird nur für die Quiz-Ansichten überhaupt aufgebaut
+views = ["🃏 Flashcards", "✍️ Schreiben", "🧩 Lückentext", "📝 Liste"]
+active_tab = st.radio("Ansicht", views, horizontal=True, key="active_tab", label_visibility="collapsed")
+
+if active_tab == views[0]:
+    render_flashcards(df, get_card(columns, current_file, fingerprint), current_file, is_empty_mode)
+    nav_prefix = "fc"
+elif active_tab == views[1]:
+    render_writing(df, get_card(columns, current_file, fingerprint), current_file, is_empty_mode)
+    nav_prefix = "wr"
+elif active_tab == views[2]:
+    card = get_card(columns, current_file, fingerprint)
+    render_gap_text(df, card, current_file, is_empty_mode)
+    nav_prefix = "gap" if card.get('Beispielsatz') else None
+else:
+    render_list(df, current_file)
+    nav_prefix = None
+
+if nav_prefix and not is_empty_mode:
+    render_navigation(df, nav_prefix)
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# app.py und trainer_core.py liegen im Projektwurzelverzeichnis, nicht in einem Paket
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
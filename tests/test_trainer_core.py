@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from trainer_core import (
+    STATUS_CATEGORIES, FenwickSampler, append_status_log, apply_editor_changes,
+    get_status_log_path, normalize_status, replay_status_log,
+)
+
+
+def make_df(words, statuses=None):
+    df = pd.DataFrame({
+        'Deutsch': words,
+        'Farsi': [f"fa_{w}" for w in words],
+        'Status': statuses or ['Neutral'] * len(words),
+    })
+    df['Status'] = normalize_status(df['Status'])
+    return df
+
+
+def test_sampler_frequencies_follow_weights_after_update():
+    sampler = FenwickSampler([1.0, 2.0, 3.0, 4.0, 0.0])
+    sampler.update(0, 10.0)
+    sampler.update(3, 0.0)
+    rng = np.random.default_rng(0)
+    n = 50_000
+    counts = np.bincount([sampler.sample(rng) for _ in range(n)], minlength=5)
+    expected = np.array([10.0, 2.0, 3.0, 0.0, 0.0]) / 15.0
+    assert counts[3] == 0 and counts[4] == 0
+    np.testing.assert_allclose(counts / n, expected, atol=0.01)
+
+
+def test_sampler_total_tracks_updates():
+    sampler = FenwickSampler([2.0] * 7)
+    sampler.update(6, 10.0)
+    sampler.update(2, 0.2)
+    assert np.isclose(sampler.total, sampler.weights.sum())
+
+
+def test_editor_changes_keep_positional_index_and_categorical_status():
+    df = make_df(['a', 'b', 'c', 'd', 'e'])
+    changes = {
+        "edited_rows": {0: {"Deutsch": "a2", "Status": "Red"}, 4: {"Farsi": None}},
+        "deleted_rows": [1, 3],
+        "added_rows": [{"Deutsch": "f"}],
+    }
+    apply_editor_changes(df, changes)
+    assert list(df.index) == list(range(4))
+    assert list(df['Deutsch']) == ['a2', 'c', 'e', 'f']
+    assert list(df['Farsi']) == ['fa_a', 'fa_c', '', '']
+    assert isinstance(df['Status'].dtype, pd.CategoricalDtype)
+    assert list(df['Status'].cat.categories) == STATUS_CATEGORIES
+    assert list(df['Status']) == ['Red', 'Neutral', 'Neutral', 'Neutral']
+
+
+def test_replay_keeps_last_entry_per_row(tmp_path):
+    filename = str(tmp_path / "modul.csv")
+    append_status_log(filename, {0: 'Red', 2: 'Green'})
+    append_status_log(filename, {0: 'Green'})
+    df = replay_status_log(make_df(['a', 'b', 'c']), filename)
+    assert list(df['Status']) == ['Green', 'Neutral', 'Green']
+
+
+def test_replay_skips_bad_lines(tmp_path):
+    filename = str(tmp_path / "modul.csv")
+    with open(get_status_log_path(filename), 'wb') as f:
+        f.write(b'{"i": 0, "s": "Red"}\n')
+        f.write(b'\n')
+        f.write(b'{"i": 1, "s": "Blue"}\n')
+        f.write(b'{"i": 99, "s": "Red"}\n')
+        f.write(b'[1, 2]\n')
+        f.write(b'{"i": 2, "s": "Re')
+    df = replay_status_log(make_df(['a', 'b', 'c']), filename)
+    assert len(df) == 3
+    assert list(df['Status']) == ['Red', 'Neutral', 'Neutral']
+    assert isinstance(df['Status'].dtype, pd.CategoricalDtype)
@@ -0,0 +1,143 @@
+"""Datenlogik des Vokabeltrainers ohne Streamlit: Status-Log, Editor-Deltas und gewichtete Ziehung.
+
+Liegt getrennt von app.py, weil app.py beim Import die ganze Oberfläche
+ausführt; so lassen sich diese Funktionen direkt testen.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    import json
+    orjson = None
+
+STATUS_CATEGORIES = ['Neutral', 'Red', 'Green']
+STATUS_WEIGHTS = {'Neutral': 2.0, 'Red': 10.0, 'Green': 0.2}
+# Gewicht je Categorical-Code, Reihenfolge wie STATUS_CATEGORIES
+WEIGHT_LUT = np.array([STATUS_WEIGHTS[s] for s in STATUS_CATEGORIES])
+STATUS_LOG_SUFFIX = ".statuslog.jsonl"
+
+def json_dumps(obj, indent=False):
+    """JSON als UTF-8-Bytes, über orjson wenn installiert, sonst über die Standardbibliothek."""
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+def json_loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+# --- STATUS-LOG ---
+
+def get_status_log_path(filename):
+    """Pfad des Status-Logs, in dem Bewertungen bis zum nächsten Speichern landen."""
+    return filename + STATUS_LOG_SUFFIX
+
+def append_status_log(filename, entries):
+    """Hängt Bewertungen (Position -> Status) in einem Schreibzugriff an und gibt die neue Größe des Logs zurück."""
+    data = b"".join(json_dumps({"i": int(pos), "s": status}) + b"\n" for pos, status in entries.items())
+    with open(get_status_log_path(filename), 'ab') as f:
+        f.write(data)
+        return f.tell()
+
+def replay_status_log(df, filename):
+    log_path = get_status_log_path(filename)
+    if not os.path.exists(log_path):
+        return df
+    latest = {}
+    with open(log_path, 'rb') as f:
+        for line in f:
+            try:
+                entry = json_loads(line)
+                latest[int(entry["i"])] = entry["s"]
+            except (ValueError, KeyError, TypeError):
+                # Leere oder abgeschnittene Zeile (Absturz mitten im Schreiben): nur diese Bewertung fehlt,
+                # nicht das ganze Modul
+                continue
+    # Pro Zeile zählt nur die letzte Bewertung, zugewiesen wird in einem Schritt
+    status = pd.Series(latest, dtype=object)
+    status = status[(status.index >= 0) & (status.index < len(df)) & status.isin(STATUS_CATEGORIES)]
+    if not status.empty:
+        df.iloc[status.index, df.columns.get_loc('Status')] = status.values
+    return df
+
+def clear_status_log(filename):
+    log_path = get_status_log_path(filename)
+    if os.path.exists(log_path):
+        os.remove(log_path)
+
+# --- TABELLE ---
+
+def normalize_status(status):
+    """Status als Categorical; leere oder unbekannte Werte werden zu 'Neutral'."""
+    return pd.Categorical(status.where(status.isin(STATUS_CATEGORIES), 'Neutral'), categories=STATUS_CATEGORIES)
+
+def empty_value(col):
+    return "Neutral" if col == 'Status' else ""
+
+def apply_editor_changes(df, changes):
+    """Überträgt die Deltas des data_editor (edited/added/deleted rows) direkt in df.
+
+    Danach ist der Index wieder 0..N-1, damit Positionen und Labels übereinstimmen.
+    """
+    for pos, values in changes.get("edited_rows", {}).items():
+        for col, val in values.items():
+            if col in df.columns:
+                df.iat[int(pos), df.columns.get_loc(col)] = empty_value(col) if val is None else val
+    deleted = changes.get("deleted_rows", [])
+    if deleted:
+        df.drop(index=df.index[deleted], inplace=True)
+        df.reset_index(drop=True, inplace=True)
+    for added in changes.get("added_rows", []):
+        df.loc[len(df)] = [empty_value(col) if added.get(col) is None else added[col] for col in df.columns]
+    if changes.get("added_rows") and 'Status' in df.columns:
+        # Anhängen per .loc kann die Categorical-Spalte zu object machen
+        df['Status'] = normalize_status(df['Status'])
+    return df
+
+# --- GEWICHTETE ZIEHUNG ---
+
+class FenwickSampler:
+    """Gewichtete Ziehung über einen Fenwick-Baum: Punkt-Update und Ziehung in O(log N)."""
+
+    def __init__(self, weights):
+        self.weights = np.array(weights, dtype=np.float64)
+        self.size = len(self.weights)
+        # tree[i] hält die Summe der Gewichte (i - lowbit(i), i], 1-basiert
+        idx = np.arange(1, self.size + 1)
+        cum = np.concatenate(([0.0], np.cumsum(self.weights)))
+        self.tree = np.zeros(self.size + 1)
+        self.tree[1:] = cum[idx] - cum[idx - (idx & -idx)]
+        self.total = cum[-1]
+
+    def update(self, pos, weight):
+        delta = weight - self.weights[pos]
+        self.weights[pos] = weight
+        self.total += delta
+        i = pos + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def sample(self, rng=np.random):
+        """Position einer zufälligen Zeile, proportional zu ihrem Gewicht."""
+        r = rng.random() * self.total
+        pos = 0
+        step = 1 << (self.size.bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.tree[nxt] <= r:
+                pos = nxt
+                r -= self.tree[nxt]
+            step >>= 1
+        return min(pos, self.size - 1)
+
+def compute_weights(df):
+    """Ziehungsgewichte pro Zeile: schwere Wörter oft, leichte selten."""
+    if 'Status' not in df.columns:
+        return np.full(len(df), STATUS_WEIGHTS['Neutral'])
+    codes = df['Status'].cat.codes.to_numpy()
+    # Code -1 (fehlender Wert) würde sonst still das letzte LUT-Gewicht treffen
+    return WEIGHT_LUT[np.where(codes < 0, STATUS_CATEGORIES.index('Neutral'), codes)]